@@ -0,0 +1,283 @@
+"""
+NanoWOL - CLI Command Implementations
+Command bodies for the nanowol CLI, imported on demand by the LazyGroup
+in nanowol.py so unrelated commands never load for a given invocation.
+Part of the Nano Product Family.
+"""
+
+import sys
+from pathlib import Path
+
+import click
+
+# Mirror agent.DEFAULT_AGENT_PORT / webui.DEFAULT_WEBUI_PORT; importing
+# them here would drag Flask into every CLI start
+DEFAULT_AGENT_PORT = 5000
+DEFAULT_WEBUI_PORT = 5050
+
+
+@click.command()
+@click.option("--keys-dir", default="./keys", help="Directory to store keys")
+@click.option("--force", is_flag=True, help="Overwrite existing keys")
+def keygen(keys_dir: str, force: bool):
+    """Generate Ed25519 key pair for authentication."""
+    keys_path = Path(keys_dir)
+    private_path = keys_path / "private.pem"
+    
+    if private_path.exists() and not force:
+        click.echo(click.style("Warning: Keys already exist. Use --force to overwrite.", fg="yellow"))
+        return
+    
+    click.echo("Generating Ed25519 key pair...")
+    from crypto import generate_key_pair
+
+    private_path, public_path = generate_key_pair(keys_path)
+    
+    click.echo(click.style("Key pair generated successfully!", fg="green"))
+    click.echo(f"  Private key: {private_path}")
+    click.echo(f"  Public key:  {public_path}")
+    click.echo()
+    click.echo(click.style("IMPORTANT:", fg="yellow"))
+    click.echo("  - Keep the private key SECRET (controller side)")
+    click.echo("  - Copy the public key to the target PC (agent side)")
+
+
+@click.command()
+@click.option("--host", default="0.0.0.0", help="Host to bind to")
+@click.option("--port", default=DEFAULT_AGENT_PORT, help="Port to listen on")
+@click.option("--mac", required=True, help="MAC address for WOL (format: AA:BB:CC:DD:EE:FF)")
+@click.option("--public-key", default="./keys/public.pem", help="Path to public key")
+@click.option("--shutdown-delay", default=5, help="Delay before shutdown in seconds")
+def agent(host: str, port: int, mac: str, public_key: str, shutdown_delay: int):
+    """Start the agent server on the target PC."""
+    public_key_path = Path(public_key)
+    
+    if not public_key_path.exists():
+        click.echo(click.style(f"Error: Public key not found: {public_key}", fg="red"))
+        click.echo("  Run 'nanowol keygen' first, then copy public.pem to this machine.")
+        sys.exit(1)
+    
+    click.echo(click.style("NanoWOL Agent", fg="cyan", bold=True))
+    click.echo(f"  MAC Address:    {mac}")
+    click.echo(f"  Public Key:     {public_key_path}")
+    click.echo(f"  Shutdown Delay: {shutdown_delay}s")
+    click.echo()
+    click.echo(f"Starting server on http://{host}:{port}")
+    click.echo(click.style("Press Ctrl+C to stop", fg="yellow"))
+    click.echo()
+    
+    from agent import create_agent_app
+
+    app = create_agent_app(mac, public_key_path, shutdown_delay)
+    try:
+        from waitress import serve
+    except ImportError:
+        click.echo(click.style("Warning: waitress not installed, using Flask dev server.", fg="yellow"))
+        app.run(host=host, port=port, debug=False)
+    else:
+        # Production WSGI server: concurrent requests don't serialize
+        # behind a blocking signature verify
+        serve(app, host=host, port=port, threads=8, ident="NanoWOL")
+
+
+@click.command()
+@click.option("--target", required=True, help="Agent URL (e.g., http://192.168.0.50:5000)")
+def wake(target: str):
+    """Send Wake-on-LAN request to the agent."""
+    # One request per CLI invocation: a pooled Session would buy nothing
+    # here. The web UI, which issues repeated calls, pools in webui.py.
+    import requests as req
+    
+    click.echo(f"Sending WOL request to {target}...")
+    
+    try:
+        # (connect, read) split: a dead agent fails in 2s instead of
+        # pinning the command for the full 10s budget
+        resp = req.post(f"{target}/wol", timeout=(2.0, 5.0))
+        
+        if resp.status_code == 200:
+            result = resp.json()
+            click.echo(click.style(f"Success: {result.get('status', 'OK')}", fg="green"))
+            warning = result.get("warning")
+            if warning:
+                click.echo(click.style(f"Warning: {warning}", fg="yellow"))
+        else:
+            result = resp.json()
+            click.echo(click.style(f"Error: {result.get('error', 'Failed')}", fg="red"))
+            
+    except Exception as e:
+        click.echo(click.style(f"Error: {e}", fg="red"))
+        sys.exit(1)
+
+
+@click.command()
+@click.option("--target", required=True, help="Agent URL (e.g., http://192.168.0.50:5000)")
+@click.option("--private-key", default="./keys/private.pem", help="Path to private key")
+@click.option("--close-port", is_flag=True, help="Close agent port after shutdown")
+def shutdown(target: str, private_key: str, close_port: bool):
+    """Send signed shutdown command to the agent."""
+    import requests as req
+    
+    private_key_path = Path(private_key)
+    
+    if not private_key_path.exists():
+        click.echo(click.style(f"Error: Private key not found: {private_key}", fg="red"))
+        click.echo("  Run 'nanowol keygen' first.")
+        sys.exit(1)
+    
+    click.echo(f"Sending shutdown command to {target}...")
+    
+    try:
+        from crypto import create_signed_payload, load_private_key
+
+        key = load_private_key(private_key_path)
+        # Use replay-protected payload
+        signed_data = create_signed_payload("shutdown", key)
+        signed_data["close_port"] = close_port
+        
+        resp = req.post(
+            f"{target}/shutdown",
+            json=signed_data,
+            timeout=(2.0, 10.0)
+        )
+        
+        if resp.status_code == 200:
+            result = resp.json()
+            click.echo(click.style(f"Success: {result.get('status', 'OK')}", fg="green"))
+        else:
+            result = resp.json()
+            click.echo(click.style(f"Error: {result.get('error', 'Failed')}", fg="red"))
+            
+    except Exception as e:
+        click.echo(click.style(f"Error: {e}", fg="red"))
+        sys.exit(1)
+
+
+@click.command()
+@click.option("--host", default="0.0.0.0", help="Host to bind to")
+@click.option("--port", default=DEFAULT_WEBUI_PORT, help="Port to listen on")
+@click.option("--target", required=True, help="Agent URL for shutdown (e.g., http://192.168.0.50:5000)")
+@click.option("--mac", required=True, help="Target MAC address for WOL (e.g., AA:BB:CC:DD:EE:FF)")
+@click.option("--private-key", default="./keys/private.pem", help="Path to private key")
+@click.option("--password", envvar="NANOWOL_PASSWORD", help="Access password (or set NANOWOL_PASSWORD env var)")
+@click.option("--dev", is_flag=True, help="Use the Flask dev server (debug/reload) instead of waitress")
+def webui(host: str, port: int, target: str, mac: str, private_key: str, password: str, dev: bool):
+    """Start the web control panel."""
+    from webui import create_webui_app, generate_password
+
+    private_key_path = Path(private_key)
+
+    if not password:
+        password = generate_password()
+        click.echo(click.style("Warning: No password set. Generated temporary password:", fg="yellow"))
+        click.echo(click.style(f"   {password}", fg="cyan", bold=True))
+        click.echo()
+    
+    if not private_key_path.exists():
+        click.echo(click.style(f"Warning: Private key not found: {private_key}", fg="yellow"))
+        click.echo("  Shutdown commands will not work. Run 'nanowol keygen' first.")
+        click.echo()
+    
+    click.echo(click.style("NanoWOL Web UI", fg="cyan", bold=True))
+    click.echo(f"  Target Agent: {target}")
+    click.echo(f"  Target MAC:   {mac}")
+    click.echo(f"  Private Key:  {private_key_path}")
+    click.echo()
+    click.echo(f"Starting web UI on http://{host}:{port}")
+    click.echo(click.style("Press Ctrl+C to stop", fg="yellow"))
+    click.echo()
+    
+    app = create_webui_app(target, private_key_path, password, mac)
+    if dev:
+        app.run(host=host, port=port, debug=True)
+        return
+    try:
+        from waitress import serve
+    except ImportError:
+        click.echo(click.style("Warning: waitress not installed, using Flask dev server.", fg="yellow"))
+        app.run(host=host, port=port, debug=False)
+    else:
+        serve(app, host=host, port=port, threads=4, ident="NanoWOL")
+
+
+# =============================================================================
+# SERVICE COMMANDS
+# =============================================================================
+
+@click.command("install-service")
+@click.option("--mac", required=True, help="MAC address for WOL (format: AA:BB:CC:DD:EE:FF)")
+@click.option("--public-key", default="./keys/public.pem", help="Path to public key")
+@click.option("--admin", is_flag=True, help="Admin mode: start at boot without login (requires admin rights)")
+def install_service_cmd(mac: str, public_key: str, admin: bool):
+    """Install agent as a system service (auto-start on boot)."""
+    from service import get_platform_name
+
+    click.echo(click.style("NanoWOL Service Installer", fg="cyan", bold=True))
+    click.echo(f"  Platform: {get_platform_name()}")
+    click.echo(f"  MAC:      {mac}")
+    click.echo(f"  Mode:     {'Boot (no login needed)' if admin else 'Logon (after login)'}")
+    click.echo()
+    
+    public_key_path = Path(public_key)
+    if not public_key_path.exists():
+        click.echo(click.style(f"Error: Public key not found: {public_key}", fg="red"))
+        click.echo("  Run 'nanowol keygen' first.")
+        sys.exit(1)
+
+    from service import install_service
+
+    if admin:
+        click.echo(click.style("Note: Admin mode requires running PowerShell as Administrator", fg="yellow"))
+        click.echo()
+    
+    click.echo("Installing service...")
+    if install_service(mac, public_key, admin):
+        click.echo(click.style("Service installed successfully!", fg="green"))
+        click.echo()
+        if admin:
+            click.echo("The agent will start automatically on system boot (no login needed).")
+        else:
+            click.echo("The agent will start automatically after you log in.")
+        click.echo("Use 'nanowol service-status' to check the status.")
+    else:
+        click.echo(click.style("Failed to install service.", fg="red"))
+        sys.exit(1)
+
+
+@click.command("uninstall-service")
+def uninstall_service_cmd():
+    """Remove the agent system service."""
+    from service import get_platform_name
+
+    click.echo(click.style("NanoWOL Service Uninstaller", fg="cyan", bold=True))
+    click.echo(f"  Platform: {get_platform_name()}")
+    click.echo()
+    
+    from service import uninstall_service
+
+    click.echo("Removing service...")
+    if uninstall_service():
+        click.echo(click.style("Service removed successfully!", fg="green"))
+    else:
+        click.echo(click.style("Service not found or could not be removed.", fg="yellow"))
+
+
+@click.command("service-status")
+def service_status_cmd():
+    """Check the status of the agent service."""
+    from service import get_platform_name
+
+    click.echo(click.style("NanoWOL Service Status", fg="cyan", bold=True))
+    click.echo(f"  Platform: {get_platform_name()}")
+    click.echo()
+    
+    from service import get_service_status
+
+    status = get_service_status()
+    
+    if status.get("installed"):
+        click.echo(click.style(f"  Status: {status.get('status', 'unknown')}", fg="green"))
+    else:
+        click.echo(click.style("  Status: Not installed", fg="yellow"))
+        click.echo()
+        click.echo("Use 'nanowol install-service --mac XX:XX:XX:XX:XX:XX' to install.")
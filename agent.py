@@ -1,157 +1,239 @@
-"""
-NanoWOL - Agent Server Module
-Flask server running on the target PC to receive wake/shutdown commands.
-Part of the Nano Product Family.
-"""
-
-import os
-import sys
-import subprocess
-import logging
-import shutil
-from pathlib import Path
-from datetime import datetime
-from flask import Flask, request, jsonify
-
-from crypto import load_public_key, verify_signature, verify_signed_payload
-from wol import send_wol_packet
-from version import VERSION
-
-logger = logging.getLogger(__name__)
-
-DEFAULT_AGENT_PORT = 5000
-
-
-def create_agent_app(mac_address: str, public_key_path: Path, shutdown_delay: int = 5) -> Flask:
-    """
-    Create Flask app for the agent server.
-    
-    This server runs on the target PC and:
-    - Sends WOL packets to wake the machine
-    - Accepts signed shutdown commands
-    
-    Args:
-        mac_address: MAC address for WOL
-        public_key_path: Path to RSA public key for signature verification
-        shutdown_delay: Seconds to wait before shutdown
-        
-    Returns:
-        Flask application instance
-    """
-    app = Flask(__name__)
-    
-    # Load public key for signature verification
-    public_key = load_public_key(public_key_path)
-    
-    # Used nonces for replay protection (in-memory, clears on restart)
-    used_nonces = set()
-    
-    @app.route("/health", methods=["GET"])
-    def health():
-        """Health check endpoint."""
-        return jsonify({
-            "status": "ok",
-            "timestamp": datetime.utcnow().isoformat(),
-            "version": VERSION
-        })
-    
-    @app.route("/wol", methods=["POST"])
-    def wol():
-        """Send Wake-on-LAN packet (requires signed payload for authentication)."""
-        try:
-            data = request.get_json() or {}
-            
-            # Require authentication via signed payload
-            if "payload" not in data:
-                logger.warning("WOL rejected: no payload")
-                return jsonify({"error": "Authentication required. Use signed payload."}), 401
-            
-            is_valid, error = verify_signed_payload(
-                data, public_key, "wol",
-                max_age_seconds=60,
-                used_nonces=used_nonces
-            )
-            if not is_valid:
-                logger.warning(f"WOL rejected: {error}")
-                return jsonify({"error": error}), 403
-            
-            send_wol_packet(mac_address)
-            logger.info(f"WOL packet sent for {mac_address}")
-            return jsonify({"status": "WOL packet sent", "mac": mac_address}), 200
-        except Exception as e:
-            logger.error(f"WOL failed: {e}")
-            return jsonify({"error": str(e)}), 500
-    
-    @app.route("/shutdown", methods=["POST"])
-    def shutdown():
-        """Initiate shutdown with RSA signature verification and replay protection."""
-        try:
-            data = request.get_json() or {}
-            close_port = data.get("close_port", False)
-            
-            # Check for payload format (required - legacy format removed for security)
-            if "payload" not in data:
-                logger.warning("Shutdown rejected: legacy format not supported")
-                return jsonify({"error": "Legacy signature format removed. Use payload with timestamp and nonce."}), 400
-            
-            # Verify signed payload with replay protection
-            is_valid, error = verify_signed_payload(
-                data, public_key, "shutdown",
-                max_age_seconds=60,
-                used_nonces=used_nonces
-            )
-            if not is_valid:
-                logger.warning(f"Shutdown rejected: {error}")
-                return jsonify({"error": error}), 403
-            
-            logger.info("Valid shutdown command received")
-
-            use_sudo = False
-            shutdown_path = shutil.which("shutdown") or "/sbin/shutdown"
-            if sys.platform != "win32" and os.geteuid() != 0:
-                if shutil.which("sudo"):
-                    sudo_check = subprocess.run(
-                        ["sudo", "-n", "-v"],
-                        capture_output=True,
-                        text=True,
-                    )
-                    if sudo_check.returncode == 0:
-                        use_sudo = True
-                    else:
-                        return jsonify({"error": "Shutdown requires passwordless sudo on this platform"}), 403
-                else:
-                    return jsonify({"error": "Shutdown requires root privileges on this platform"}), 403
-            
-            # Optional: block the agent port after shutdown
-            warning = None
-            if close_port:
-                port = request.environ.get("SERVER_PORT", DEFAULT_AGENT_PORT)
-                if sys.platform == "win32":
-                    os.system(
-                        f'netsh advfirewall firewall add rule name="BlockNanoWOL" dir=in action=block protocol=TCP localport={port}'
-                    )
-                else:
-                    warning = "close_port is only supported on Windows"
-                    logger.info(warning)
-            
-            # Initiate shutdown
-            delay_seconds = max(0, int(shutdown_delay))
-            if sys.platform == "win32":
-                subprocess.Popen(["shutdown", "/s", "/t", str(delay_seconds)])
-            else:
-                shutdown_cmd = f"sleep {delay_seconds}; {shutdown_path} -h now"
-                if use_sudo:
-                    shutdown_cmd = f"sleep {delay_seconds}; sudo -n {shutdown_path} -h now"
-                subprocess.Popen(["/bin/sh", "-c", shutdown_cmd])
-
-            response = {"status": f"Shutdown initiated (delay: {delay_seconds}s)"}
-            if warning:
-                response["warning"] = warning
-            return jsonify(response), 200
-            
-        except Exception as e:
-            logger.error(f"Shutdown error: {e}")
-            return jsonify({"error": str(e)}), 500
-    
-    return app
-
+"""
+NanoWOL - Agent Server Module
+Flask server running on the target PC to receive wake/shutdown commands.
+Part of the Nano Product Family.
+"""
+
+import os
+import sys
+import json
+import time
+import subprocess
+import logging
+import shutil
+from pathlib import Path
+from flask import Flask, Response, request, jsonify
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional speedup, stdlib json is the fallback
+    orjson = None
+
+from crypto import NonceCache, load_public_key, verify_signature, verify_signed_payload
+from wol import build_magic_packet, normalize_mac, send_magic_packet, validate_mac
+from version import VERSION
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_AGENT_PORT = 5000
+
+# Windows-only flag; 0 elsewhere so call sites stay portable
+_NO_WINDOW = getattr(subprocess, "CREATE_NO_WINDOW", 0)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson (3-10x faster than stdlib json)."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+
+def create_agent_app(mac_address: str, public_key_path: Path, shutdown_delay: int = 5) -> Flask:
+    """
+    Create Flask app for the agent server.
+    
+    This server runs on the target PC and:
+    - Sends WOL packets to wake the machine
+    - Accepts signed shutdown commands
+    
+    Args:
+        mac_address: MAC address for WOL
+        public_key_path: Path to EC public key for signature verification
+        shutdown_delay: Seconds to wait before shutdown
+        
+    Returns:
+        Flask application instance
+    """
+    # The MAC is baked into the success body and the prebuilt packet
+    # below, so a bad one must fail here rather than broadcast malformed
+    # packets for the process lifetime
+    if not validate_mac(mac_address):
+        raise ValueError(f"Invalid MAC address: {mac_address}")
+
+    app = Flask(__name__)
+
+    if orjson is not None:
+        app.json = OrjsonProvider(app)
+    # Compact separators regardless of debug mode: the remaining jsonify
+    # call sites (error paths, shutdown status) skip pretty-printing
+    app.json.compact = True
+
+    # Load public key for signature verification
+    public_key = load_public_key(public_key_path)
+    
+    # Used nonces for replay protection (in-memory, bounded, clears on restart)
+    used_nonces = NonceCache(max_age_seconds=60)
+
+    # Platform facts resolved once at construction; shutil.which walks
+    # $PATH with repeated access() syscalls, so keep it off the hot path
+    is_windows = sys.platform == "win32"
+    is_root = (not is_windows) and os.geteuid() == 0
+    shutdown_path = shutil.which("shutdown") or "/sbin/shutdown"
+    sudo_path = shutil.which("sudo")
+
+    # Cached result of the passwordless-sudo probe so repeated shutdown
+    # attempts don't each fork a sudo process
+    sudo_state = {"ok": False, "checked_at": float("-inf")}
+    sudo_check_ttl = 30.0
+    
+    # Pre-encoded /wol success body: the MAC is fixed per app instance,
+    # so the response never varies. Error paths keep jsonify.
+    wol_ok_body = b'{"status": "WOL packet sent", "mac": "' + mac_address.encode("ascii") + b'"}'
+
+    # The agent's MAC is fixed: assemble the 102-byte magic packet once
+    # so each /wol request is a bare sendto
+    wol_packet = build_magic_packet(normalize_mac(mac_address))
+
+    # Pre-encoded /health body, refreshed at most once per second so
+    # steady polling from a dashboard is a cache hit
+    health_cache = [0, b""]
+
+    @app.route("/health", methods=["GET"])
+    def health():
+        """Health check endpoint."""
+        now = int(time.time())
+        if now != health_cache[0]:
+            body = {
+                "status": "ok",
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(now)),
+                "version": VERSION
+            }
+            health_cache[1] = (
+                orjson.dumps(body) if orjson is not None
+                else json.dumps(body).encode()
+            )
+            health_cache[0] = now
+        return Response(health_cache[1], mimetype="application/json")
+    
+    @app.route("/wol", methods=["POST"])
+    def wol():
+        """Send Wake-on-LAN packet (requires signed payload for authentication)."""
+        try:
+            data = request.get_json() or {}
+            
+            # Require authentication via signed payload
+            if "payload" not in data:
+                logger.warning("WOL rejected: no payload")
+                return jsonify({"error": "Authentication required. Use signed payload."}), 401
+            
+            is_valid, error = verify_signed_payload(
+                data, public_key, "wol",
+                max_age_seconds=60,
+                used_nonces=used_nonces
+            )
+            if not is_valid:
+                logger.warning("WOL rejected: %s", error)
+                return jsonify({"error": error}), 403
+            
+            send_magic_packet(wol_packet)
+            logger.info("WOL packet sent for %s", mac_address)
+            return Response(wol_ok_body, status=200, mimetype="application/json")
+        except Exception as e:
+            logger.error("WOL failed: %s", e)
+            return jsonify({"error": str(e)}), 500
+    
+    @app.route("/shutdown", methods=["POST"])
+    def shutdown():
+        """Initiate shutdown with EC signature verification and replay protection."""
+        try:
+            data = request.get_json() or {}
+            close_port = data.get("close_port", False)
+            
+            # Check for payload format (required - legacy format removed for security)
+            if "payload" not in data:
+                logger.warning("Shutdown rejected: legacy format not supported")
+                return jsonify({"error": "Legacy signature format removed. Use payload with timestamp and nonce."}), 400
+            
+            # Verify signed payload with replay protection
+            is_valid, error = verify_signed_payload(
+                data, public_key, "shutdown",
+                max_age_seconds=60,
+                used_nonces=used_nonces
+            )
+            if not is_valid:
+                logger.warning("Shutdown rejected: %s", error)
+                return jsonify({"error": error}), 403
+            
+            logger.info("Valid shutdown command received")
+
+            use_sudo = False
+            if not is_windows and not is_root:
+                if sudo_path:
+                    now = time.monotonic()
+                    if now - sudo_state["checked_at"] > sudo_check_ttl:
+                        # Only the return code matters: no pipes, no decoding
+                        sudo_state["ok"] = subprocess.call(
+                            [sudo_path, "-n", "-v"],
+                            stdout=subprocess.DEVNULL,
+                            stderr=subprocess.DEVNULL,
+                        ) == 0
+                        sudo_state["checked_at"] = now
+                    if sudo_state["ok"]:
+                        use_sudo = True
+                    else:
+                        return jsonify({"error": "Shutdown requires passwordless sudo on this platform"}), 403
+                else:
+                    return jsonify({"error": "Shutdown requires root privileges on this platform"}), 403
+            
+            # Optional: block the agent port after shutdown
+            warning = None
+            if close_port:
+                port = int(request.environ.get("SERVER_PORT", DEFAULT_AGENT_PORT))
+                if is_windows:
+                    # argv list: no cmd.exe fork, no shell quoting on port
+                    subprocess.run(
+                        ["netsh", "advfirewall", "firewall", "add", "rule",
+                         "name=BlockNanoWOL", "dir=in", "action=block",
+                         "protocol=TCP", f"localport={port}"],
+                        check=False,
+                        creationflags=_NO_WINDOW,
+                    )
+                else:
+                    warning = "close_port is only supported on Windows"
+                    logger.info(warning)
+            
+            # Initiate shutdown
+            delay_seconds = max(0, int(shutdown_delay))
+            if is_windows:
+                subprocess.Popen(
+                    ["shutdown", "/s", "/t", str(delay_seconds)],
+                    creationflags=_NO_WINDOW,
+                )
+            else:
+                # shutdown(8) schedules the delay itself (minute granularity),
+                # so no shell or sleep wrapper is needed
+                if delay_seconds > 0:
+                    delay_seconds = ((delay_seconds + 59) // 60) * 60
+                    delay_arg = f"+{delay_seconds // 60}"
+                else:
+                    delay_arg = "now"
+                args = [shutdown_path, "-h", delay_arg]
+                if use_sudo:
+                    args = [sudo_path, "-n"] + args
+                os.posix_spawn(args[0], args, dict(os.environ))
+
+            response = {"status": f"Shutdown initiated (delay: {delay_seconds}s)"}
+            if warning:
+                response["warning"] = warning
+            return jsonify(response), 200
+            
+        except Exception as e:
+            logger.error("Shutdown error: %s", e)
+            return jsonify({"error": str(e)}), 500
+    
+    return app
+
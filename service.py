@@ -9,13 +9,18 @@ Supported platforms:
 - macOS: launchd user agent
 """
 
-import os
-import sys
-import subprocess
-import logging
-import shutil
+import os
+import sys
+import time
+import string
+import getpass
+import subprocess
+import logging
+import shutil
 from pathlib import Path
 
+from wol import validate_mac
+
 logger = logging.getLogger(__name__)
 
 IS_WINDOWS = sys.platform == "win32"
@@ -24,70 +29,40 @@ IS_MACOS = sys.platform == "darwin"
 
 SERVICE_NAME = "NanoWOL-Agent"
 
+# Service definition templates, compiled once at import. string.Template
+# substitution keeps the placeholders in one auditable place instead of
+# rebuilding multi-kilobyte f-strings per call, and the MAC is validated
+# before it is ever substituted into a definition.
 
-def get_python_executable() -> str:
-    """Get the path to the Python executable."""
-    return sys.executable
-
-
-def get_script_path() -> Path:
-    """Get the path to nanowol.py."""
-    return Path(__file__).parent / "nanowol.py"
-
-
-# =============================================================================
-# WINDOWS
-# =============================================================================
-
-def install_windows_task(mac_address: str, public_key: str = "./keys/public.pem", admin_mode: bool = False) -> bool:
-    """
-    Install NanoWOL agent as a Windows Task Scheduler task.
-    
-    Args:
-        mac_address: Target MAC address
-        public_key: Path to public key
-        admin_mode: If True, uses BootTrigger (no login needed, requires admin)
-                    If False, uses LogonTrigger (needs login, no admin needed)
-    """
-    if not IS_WINDOWS:
-        return False
-    
-    python_exe = get_python_executable()
-    script_path = get_script_path()
-    
-    import getpass
-    username = getpass.getuser()
-    
-    if admin_mode:
-        # Admin mode: starts at boot, runs as SYSTEM (no login needed)
-        trigger_xml = """<BootTrigger>
+_BOOT_TRIGGER_XML = """<BootTrigger>
       <Enabled>true</Enabled>
     </BootTrigger>"""
-        principal_xml = """<Principal id="Author">
+
+_LOGON_TRIGGER_XML = """<LogonTrigger>
+      <Enabled>true</Enabled>
+    </LogonTrigger>"""
+
+_BOOT_PRINCIPAL_XML = """<Principal id="Author">
       <UserId>S-1-5-18</UserId>
       <RunLevel>HighestAvailable</RunLevel>
     </Principal>"""
-    else:
-        # User mode: starts at logon (needs login, no admin needed)
-        trigger_xml = """<LogonTrigger>
-      <Enabled>true</Enabled>
-    </LogonTrigger>"""
-        principal_xml = f"""<Principal id="Author">
-      <UserId>{username}</UserId>
+
+_LOGON_PRINCIPAL_TPL = string.Template("""<Principal id="Author">
+      <UserId>$username</UserId>
       <LogonType>InteractiveToken</LogonType>
       <RunLevel>LeastPrivilege</RunLevel>
-    </Principal>"""
-    
-    task_xml = f'''<?xml version="1.0" encoding="UTF-16"?>
+    </Principal>""")
+
+_TASK_XML_TPL = string.Template('''<?xml version="1.0" encoding="UTF-16"?>
 <Task version="1.4" xmlns="http://schemas.microsoft.com/windows/2004/02/mit/task">
   <RegistrationInfo>
     <Description>NanoWOL Agent - Remote power control service</Description>
   </RegistrationInfo>
   <Triggers>
-    {trigger_xml}
+    $trigger_xml
   </Triggers>
   <Principals>
-    {principal_xml}
+    $principal_xml
   </Principals>
   <Settings>
     <MultipleInstancesPolicy>IgnoreNew</MultipleInstancesPolicy>
@@ -110,40 +85,136 @@ def install_windows_task(mac_address: str, public_key: str = "./keys/public.pem"
   </Settings>
   <Actions Context="Author">
     <Exec>
-      <Command>"{python_exe}"</Command>
-      <Arguments>"{script_path}" agent --mac {mac_address} --public-key "{public_key}"</Arguments>
-      <WorkingDirectory>{script_path.parent}</WorkingDirectory>
+      <Command>"$python_exe"</Command>
+      <Arguments>"$script_path" agent --mac $mac --public-key "$public_key"</Arguments>
+      <WorkingDirectory>$script_dir</WorkingDirectory>
     </Exec>
   </Actions>
-</Task>'''
-    
-    # Write XML to temp file
-    xml_path = Path.home() / ".nanowol_task.xml"
-    xml_path.write_text(task_xml, encoding='utf-16')
+</Task>''')
+
+_SYSTEMD_UNIT_TPL = string.Template('''[Unit]
+Description=NanoWOL Agent - Remote power control service
+After=network.target
+
+[Service]
+Type=simple
+ExecStart=$python_exe $script_path agent --mac $mac --public-key $public_key
+WorkingDirectory=$script_dir
+Restart=always
+RestartSec=10
+
+[Install]
+WantedBy=default.target
+''')
+
+_PLIST_TPL = string.Template('''<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" "http://www.apple.com/DTDs/PropertyList-1.0.dtd">
+<plist version="1.0">
+<dict>
+    <key>Label</key>
+    <string>com.nano.wol.agent</string>
+    <key>ProgramArguments</key>
+    <array>
+        <string>$python_exe</string>
+        <string>$script_path</string>
+        <string>agent</string>
+        <string>--mac</string>
+        <string>$mac</string>
+        <string>--public-key</string>
+        <string>$public_key</string>
+    </array>
+    <key>WorkingDirectory</key>
+    <string>$script_dir</string>
+    <key>RunAtLoad</key>
+    <true/>
+    <key>KeepAlive</key>
+    <true/>
+</dict>
+</plist>
+''')
+
+
+def get_python_executable() -> str:
+    """Get the path to the Python executable."""
+    return sys.executable
+
+
+def get_script_path() -> Path:
+    """Get the path to nanowol.py."""
+    return Path(__file__).parent / "nanowol.py"
+
+
+# =============================================================================
+# WINDOWS
+# =============================================================================
+
+def install_windows_task(mac_address: str, public_key: str = "./keys/public.pem", admin_mode: bool = False) -> bool:
+    """
+    Install NanoWOL agent as a Windows Task Scheduler task.
     
-    try:
-        # Create the task - use encoding to handle non-English Windows
-        result = subprocess.run(
-            [
-                "schtasks", "/create",
-                "/tn", SERVICE_NAME,
-                "/xml", str(xml_path),
-                "/f"  # Force overwrite
-            ],
-            capture_output=True,
-            text=True,
-            encoding='utf-8',
-            errors='ignore'
-        )
-        
-        if result.returncode == 0:
-            logger.info(f"Windows task '{SERVICE_NAME}' installed successfully")
-            return True
-        else:
-            logger.error(f"Failed to create task: {result.stderr}")
-            return False
-    finally:
-        xml_path.unlink(missing_ok=True)
+    Args:
+        mac_address: Target MAC address
+        public_key: Path to public key
+        admin_mode: If True, uses BootTrigger (no login needed, requires admin)
+                    If False, uses LogonTrigger (needs login, no admin needed)
+    """
+    if not IS_WINDOWS:
+        return False
+
+    if not validate_mac(mac_address):
+        logger.error(f"Invalid MAC address: {mac_address}")
+        return False
+
+    python_exe = get_python_executable()
+    script_path = get_script_path()
+
+    username = getpass.getuser()
+
+    if admin_mode:
+        # Admin mode: starts at boot, runs as SYSTEM (no login needed)
+        trigger_xml = _BOOT_TRIGGER_XML
+        principal_xml = _BOOT_PRINCIPAL_XML
+    else:
+        # User mode: starts at logon (needs login, no admin needed)
+        trigger_xml = _LOGON_TRIGGER_XML
+        principal_xml = _LOGON_PRINCIPAL_TPL.substitute(username=username)
+
+    task_xml = _TASK_XML_TPL.substitute(
+        trigger_xml=trigger_xml,
+        principal_xml=principal_xml,
+        python_exe=python_exe,
+        script_path=script_path,
+        script_dir=script_path.parent,
+        mac=mac_address,
+        public_key=public_key,
+    )
+
+    # Register the task with the XML piped over stdin: no temp file on
+    # disk, no create/unlink syscalls, no race window around the path.
+    # schtasks can't read XML from stdin, but Register-ScheduledTask
+    # accepts it as a string. Force UTF-8 stdin decoding first — Windows
+    # PowerShell otherwise reads the console's OEM code page and mangles
+    # non-ASCII usernames in <UserId> on non-English Windows.
+    result = subprocess.run(
+        [
+            "powershell", "-NoProfile", "-NonInteractive", "-Command",
+            "[Console]::InputEncoding = [Text.Encoding]::UTF8; "
+            f"Register-ScheduledTask -TaskName '{SERVICE_NAME}' "
+            "-Xml ([Console]::In.ReadToEnd()) -Force",
+        ],
+        input=task_xml,
+        capture_output=True,
+        text=True,
+        encoding='utf-8',
+        errors='ignore'
+    )
+
+    if result.returncode == 0:
+        logger.info(f"Windows task '{SERVICE_NAME}' installed successfully")
+        return True
+    else:
+        logger.error(f"Failed to create task: {result.stderr}")
+        return False
 
 
 def uninstall_windows_task() -> bool:
@@ -195,42 +266,49 @@ def get_systemd_user_dir() -> Path:
     return Path.home() / ".config" / "systemd" / "user"
 
 
-def install_linux_service(mac_address: str, public_key: str = "./keys/public.pem") -> bool:
-    """
-    Install NanoWOL agent as a systemd user service.
-    """
-    if not IS_LINUX:
-        return False
-    
+def install_linux_service(mac_address: str, public_key: str = "./keys/public.pem") -> bool:
+    """
+    Install NanoWOL agent as a systemd user service.
+    """
+    if not IS_LINUX:
+        return False
+
+    if not validate_mac(mac_address):
+        logger.error(f"Invalid MAC address: {mac_address}")
+        return False
+
     service_dir = get_systemd_user_dir()
     service_dir.mkdir(parents=True, exist_ok=True)
-    
+
     python_exe = get_python_executable()
     script_path = get_script_path()
-    
-    service_content = f'''[Unit]
-Description=NanoWOL Agent - Remote power control service
-After=network.target
 
-[Service]
-Type=simple
-ExecStart={python_exe} {script_path} agent --mac {mac_address} --public-key {public_key}
-WorkingDirectory={script_path.parent}
-Restart=always
-RestartSec=10
+    service_content = _SYSTEMD_UNIT_TPL.substitute(
+        python_exe=python_exe,
+        script_path=script_path,
+        script_dir=script_path.parent,
+        mac=mac_address,
+        public_key=public_key,
+    )
 
-[Install]
-WantedBy=default.target
-'''
-    
     service_file = service_dir / f"{SERVICE_NAME.lower()}.service"
     service_file.write_text(service_content)
     
-    # Enable and start
-    subprocess.run(["systemctl", "--user", "daemon-reload"])
-    result = subprocess.run(["systemctl", "--user", "enable", "--now", SERVICE_NAME.lower()])
-    if shutil.which("loginctl"):
-        subprocess.run(["loginctl", "enable-linger", str(os.getuid())], capture_output=True)
+    # Reload then enable+start in one systemctl invocation; only the
+    # return codes matter, so route output to DEVNULL instead of pipes
+    subprocess.run(
+        ["systemctl", "--user", "daemon-reload"],
+        check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    result = subprocess.run(
+        ["systemctl", "--user", "enable", "--now", SERVICE_NAME.lower()],
+        check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    if shutil.which("loginctl"):
+        subprocess.run(
+            ["loginctl", "enable-linger", str(os.getuid())],
+            check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
     
     if result.returncode == 0:
         logger.info(f"Linux service '{SERVICE_NAME}' installed")
@@ -238,18 +316,24 @@ WantedBy=default.target
     return False
 
 
-def uninstall_linux_service() -> bool:
-    """Remove the systemd user service."""
-    if not IS_LINUX:
-        return False
-    
-    subprocess.run(["systemctl", "--user", "stop", SERVICE_NAME.lower()])
-    subprocess.run(["systemctl", "--user", "disable", "--now", SERVICE_NAME.lower()])
+def uninstall_linux_service() -> bool:
+    """Remove the systemd user service."""
+    if not IS_LINUX:
+        return False
     
+    # disable --now stops and disables in a single systemctl process
+    subprocess.run(
+        ["systemctl", "--user", "disable", "--now", SERVICE_NAME.lower()],
+        check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
     service_file = get_systemd_user_dir() / f"{SERVICE_NAME.lower()}.service"
     if service_file.exists():
         service_file.unlink()
-        subprocess.run(["systemctl", "--user", "daemon-reload"])
+        subprocess.run(
+            ["systemctl", "--user", "daemon-reload"],
+            check=False, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
         logger.info(f"Linux service '{SERVICE_NAME}' removed")
         return True
     return False
@@ -259,18 +343,20 @@ def get_linux_service_status() -> dict:
     """Get the status of the systemd service."""
     if not IS_LINUX:
         return {"installed": False, "platform": "not linux"}
-    
+
+    # Cheap filesystem check first; only fork systemctl when installed
+    service_file = get_systemd_user_dir() / f"{SERVICE_NAME.lower()}.service"
+    if not service_file.exists():
+        return {"installed": False, "status": "not installed"}
+
     result = subprocess.run(
         ["systemctl", "--user", "is-active", SERVICE_NAME.lower()],
         capture_output=True, text=True
     )
-    
-    service_file = get_systemd_user_dir() / f"{SERVICE_NAME.lower()}.service"
-    installed = service_file.exists()
-    
+
     return {
-        "installed": installed,
-        "status": result.stdout.strip() if installed else "not installed"
+        "installed": True,
+        "status": result.stdout.strip()
     }
 
 
@@ -283,52 +369,38 @@ def get_launchd_dir() -> Path:
     return Path.home() / "Library" / "LaunchAgents"
 
 
-def install_macos_service(mac_address: str, public_key: str = "./keys/public.pem") -> bool:
-    """
-    Install NanoWOL agent as a macOS launchd agent.
-    """
-    if not IS_MACOS:
-        return False
-    
+def install_macos_service(mac_address: str, public_key: str = "./keys/public.pem") -> bool:
+    """
+    Install NanoWOL agent as a macOS launchd agent.
+    """
+    if not IS_MACOS:
+        return False
+
+    if not validate_mac(mac_address):
+        logger.error(f"Invalid MAC address: {mac_address}")
+        return False
+
     launch_dir = get_launchd_dir()
     launch_dir.mkdir(parents=True, exist_ok=True)
-    
+
     python_exe = get_python_executable()
     script_path = get_script_path()
-    
-    plist_content = f'''<?xml version="1.0" encoding="UTF-8"?>
-<!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" "http://www.apple.com/DTDs/PropertyList-1.0.dtd">
-<plist version="1.0">
-<dict>
-    <key>Label</key>
-    <string>com.nano.wol.agent</string>
-    <key>ProgramArguments</key>
-    <array>
-        <string>{python_exe}</string>
-        <string>{script_path}</string>
-        <string>agent</string>
-        <string>--mac</string>
-        <string>{mac_address}</string>
-        <string>--public-key</string>
-        <string>{public_key}</string>
-    </array>
-    <key>WorkingDirectory</key>
-    <string>{script_path.parent}</string>
-    <key>RunAtLoad</key>
-    <true/>
-    <key>KeepAlive</key>
-    <true/>
-</dict>
-</plist>
-'''
-    
+
+    plist_content = _PLIST_TPL.substitute(
+        python_exe=python_exe,
+        script_path=script_path,
+        script_dir=script_path.parent,
+        mac=mac_address,
+        public_key=public_key,
+    )
+
     plist_file = launch_dir / "com.nano.wol.agent.plist"
     plist_file.write_text(plist_content)
     
-    uid = os.getuid()
-    result = subprocess.run(["launchctl", "bootstrap", f"gui/{uid}", str(plist_file)], capture_output=True)
-    if result.returncode != 0:
-        result = subprocess.run(["launchctl", "load", str(plist_file)], capture_output=True)
+    uid = os.getuid()
+    result = subprocess.run(["launchctl", "bootstrap", f"gui/{uid}", str(plist_file)], capture_output=True)
+    if result.returncode != 0:
+        result = subprocess.run(["launchctl", "load", str(plist_file)], capture_output=True)
     
     if result.returncode == 0:
         logger.info(f"macOS agent '{SERVICE_NAME}' installed")
@@ -336,18 +408,18 @@ def install_macos_service(mac_address: str, public_key: str = "./keys/public.pem
     return False
 
 
-def uninstall_macos_service() -> bool:
-    """Remove the macOS launchd agent."""
-    if not IS_MACOS:
-        return False
-    
-    plist_file = get_launchd_dir() / "com.nano.wol.agent.plist"
-    
-    if plist_file.exists():
-        uid = os.getuid()
-        result = subprocess.run(["launchctl", "bootout", f"gui/{uid}", str(plist_file)], capture_output=True)
-        if result.returncode != 0:
-            subprocess.run(["launchctl", "unload", str(plist_file)], capture_output=True)
+def uninstall_macos_service() -> bool:
+    """Remove the macOS launchd agent."""
+    if not IS_MACOS:
+        return False
+    
+    plist_file = get_launchd_dir() / "com.nano.wol.agent.plist"
+    
+    if plist_file.exists():
+        uid = os.getuid()
+        result = subprocess.run(["launchctl", "bootout", f"gui/{uid}", str(plist_file)], capture_output=True)
+        if result.returncode != 0:
+            subprocess.run(["launchctl", "unload", str(plist_file)], capture_output=True)
         plist_file.unlink()
         logger.info(f"macOS agent '{SERVICE_NAME}' removed")
         return True
@@ -409,16 +481,30 @@ def uninstall_service() -> bool:
         return False
 
 
+# Most recent status with its timestamp; schtasks/systemctl/launchctl
+# probes are fork-heavy, so repeat queries within the TTL reuse it
+_STATUS_CACHE = {}
+_STATUS_TTL = 2.0
+
+
 def get_service_status() -> dict:
-    """Get the service status on the current platform."""
+    """Get the service status on the current platform (cached briefly)."""
+    now = time.monotonic()
+    cached = _STATUS_CACHE.get("status")
+    if cached and now - cached[0] < _STATUS_TTL:
+        return cached[1]
+
     if IS_WINDOWS:
-        return get_windows_task_status()
+        status = get_windows_task_status()
     elif IS_LINUX:
-        return get_linux_service_status()
+        status = get_linux_service_status()
     elif IS_MACOS:
-        return get_macos_service_status()
+        status = get_macos_service_status()
     else:
-        return {"installed": False, "platform": sys.platform, "error": "unsupported"}
+        status = {"installed": False, "platform": sys.platform, "error": "unsupported"}
+
+    _STATUS_CACHE["status"] = (now, status)
+    return status
 
 
 def get_platform_name() -> str:
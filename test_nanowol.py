@@ -2,6 +2,7 @@
 NanoWOL Unit Tests
 Tests for crypto, WOL, service, and utility functions.
 Run with: python -m pytest test_nanowol.py -v
+Or in parallel: python -m pytest test_nanowol.py -n auto
 Or: python test_nanowol.py
 """
 
@@ -9,6 +10,7 @@ import unittest
 import tempfile
 import os
 import sys
+import shutil
 from pathlib import Path
 
 from crypto import generate_key_pair, load_private_key, load_public_key, sign_message, verify_signature
@@ -19,19 +21,34 @@ from service import (
 )
 
 
+# Keep test key material on tmpfs where available (Linux): PEM writes
+# then skip disk metadata/fsync overhead entirely
+_TMPFS = "/dev/shm" if sys.platform.startswith("linux") and os.path.isdir("/dev/shm") else None
+
+
 class TestCrypto(unittest.TestCase):
     """Tests for crypto module."""
-    
+
+    @classmethod
+    def setUpClass(cls):
+        """Generate one template key pair shared by all crypto tests."""
+        cls.template_dir = tempfile.mkdtemp(dir=_TMPFS)
+        generate_key_pair(Path(cls.template_dir))
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the shared template keys."""
+        shutil.rmtree(cls.template_dir, ignore_errors=True)
+
     def setUp(self):
-        """Create temporary directory for keys."""
-        self.temp_dir = tempfile.mkdtemp()
+        """Copy the template keys into a fresh per-test directory."""
+        self.temp_dir = tempfile.mkdtemp(dir=_TMPFS)
         self.keys_dir = Path(self.temp_dir)
-    
+        shutil.copytree(self.template_dir, self.keys_dir, dirs_exist_ok=True)
+
     def tearDown(self):
         """Clean up temporary files."""
-        for f in self.keys_dir.glob("*.pem"):
-            f.unlink()
-        os.rmdir(self.temp_dir)
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
     
     def test_generate_key_pair(self):
         """Test key pair generation."""
@@ -44,8 +61,6 @@ class TestCrypto(unittest.TestCase):
     
     def test_load_keys(self):
         """Test loading generated keys."""
-        generate_key_pair(self.keys_dir)
-        
         private_key = load_private_key(self.keys_dir / "private.pem")
         public_key = load_public_key(self.keys_dir / "public.pem")
         
@@ -54,8 +69,6 @@ class TestCrypto(unittest.TestCase):
     
     def test_sign_and_verify(self):
         """Test signing and verifying a message."""
-        generate_key_pair(self.keys_dir)
-        
         private_key = load_private_key(self.keys_dir / "private.pem")
         public_key = load_public_key(self.keys_dir / "public.pem")
         
@@ -89,6 +102,7 @@ class TestWOL(unittest.TestCase):
         self.assertFalse(validate_mac("AA:BB:CC:DD:EE:FF:GG"))  # Too long
         self.assertFalse(validate_mac("AABBCCDDEEFF"))  # No separators
         self.assertFalse(validate_mac("GG:HH:II:JJ:KK:LL"))  # Invalid chars
+        self.assertFalse(validate_mac("AA:BB-CC:DD-EE:FF"))  # Mixed separators
     
     def test_normalize_mac(self):
         """Test MAC normalization."""
@@ -4,55 +4,106 @@ Flask server providing a web control panel for remote power management.
 Part of the Nano Product Family.
 """
 
+import hmac
 import logging
 import secrets
 from pathlib import Path
+
+import requests
 from flask import Flask, request, render_template
+from requests.adapters import HTTPAdapter, Retry
 
 from crypto import load_private_key, sign_message
-from wol import send_wol_packet
+from wol import build_magic_packet, normalize_mac, send_magic_packet, validate_mac
 from version import VERSION
 
 logger = logging.getLogger(__name__)
 
 DEFAULT_WEBUI_PORT = 5050
 
+# Shared session so repeated agent calls reuse one keep-alive connection
+# instead of a fresh TCP handshake per click. Connect-phase failures
+# retry at the adapter with a short backoff; Retry's default method
+# whitelist keeps POSTs from re-sending once a request has gone out, so
+# a signed payload is never delivered twice.
+_SESSION = requests.Session()
+_SESSION.mount("http://", HTTPAdapter(
+    pool_connections=2,
+    pool_maxsize=8,
+    max_retries=Retry(total=3, backoff_factor=0.2, status_forcelist=[502, 503, 504]),
+))
+
+
+# Built apps keyed by their full configuration: repeated calls with the
+# same arguments (tests, reloads) reuse one app instead of re-registering
+# routes and re-reading the key
+_APP_CACHE = {}
+
 
 def create_webui_app(agent_url: str, private_key_path: Path, password: str, target_mac: str = None) -> Flask:
     """
-    Create Flask app for the web control panel.
-    
+    Create Flask app for the web control panel (cached per configuration).
+
     This server provides a web interface to:
     - Send wake commands DIRECTLY (magic packet via UDP broadcast)
     - Send signed shutdown commands to the agent
-    
+
     Args:
         agent_url: URL of the agent server (for shutdown)
-        private_key_path: Path to RSA private key for signing
+        private_key_path: Path to private key for signing
         password: Access password for the web UI
         target_mac: MAC address for WOL (sends directly, not through agent)
-        
+
     Returns:
         Flask application instance
     """
+    key = (agent_url, str(private_key_path), password, target_mac)
+    app = _APP_CACHE.get(key)
+    if app is None:
+        app = _build_app(agent_url, private_key_path, password, target_mac)
+        _APP_CACHE[key] = app
+    return app
+
+
+def _build_app(agent_url: str, private_key_path: Path, password: str, target_mac: str) -> Flask:
     template_dir = Path(__file__).parent / "templates"
     app = Flask(__name__, template_folder=str(template_dir))
-    
+
+    # The page template never changes at runtime: compile it once and
+    # skip the per-request mtime stat that auto-reload performs
+    app.config["TEMPLATES_AUTO_RELOAD"] = False
+    app.jinja_env.auto_reload = False
+
+    # Static assets (the extracted stylesheet) are immutable per release;
+    # the template busts the cache with a ?v=<version> query string
+    app.config["SEND_FILE_MAX_AGE_DEFAULT"] = 31536000
+
     # Load private key for signing shutdown commands
     private_key = None
     if private_key_path.exists():
         private_key = load_private_key(private_key_path)
-    
+
+    # Encoded once; the handler compares in constant time
+    password_bytes = password.encode("utf-8")
+
+    # The target MAC is fixed per app instance: validate it and build
+    # the 102-byte magic packet once, so the wake path is a bare sendto
+    magic_packet = None
+    if target_mac:
+        if not validate_mac(target_mac):
+            raise ValueError(f"Invalid MAC address: {target_mac}")
+        magic_packet = build_magic_packet(normalize_mac(target_mac))
+
     @app.route("/", methods=["GET", "POST"])
     def index():
         message = ""
         error = False
         
         if request.method == "POST":
-            # Verify password
-            submitted_password = request.form.get("password", "")
-            if submitted_password != password:
-                return render_template("index.html", message="Invalid password", error=True)
+            # Verify password (constant-time compare, no timing oracle)
+            submitted = request.form.get("password", "").encode("utf-8")
+            if not hmac.compare_digest(submitted, password_bytes):
+                return render_template("index.html", message="Invalid password", error=True, version=VERSION)
             
             action = request.form.get("action")
             close_port = "close_port" in request.form
@@ -60,27 +111,26 @@ def create_webui_app(agent_url: str, private_key_path: Path, password: str, targ
             try:
                 if action == "wake":
                     # Send WOL packet DIRECTLY from this machine
-                    if not target_mac:
+                    if magic_packet is None:
                         raise ValueError("MAC address not configured. Use --mac option.")
-                    
-                    send_wol_packet(target_mac)
+
+                    send_magic_packet(magic_packet)
                     message = f"Wake-on-LAN packet sent to {target_mac}"
                     logger.info(f"WOL packet sent to {target_mac}")
                     
                 elif action == "shutdown":
-                    import requests as req
                     from crypto import create_signed_payload
-                    
+
                     if not private_key:
                         raise ValueError("Private key not found. Run 'nanowol keygen' first.")
-                    
+
                     # Use replay-protected payload
                     signed_data = create_signed_payload("shutdown", private_key)
                     signed_data["close_port"] = close_port
-                    resp = req.post(
+                    resp = _SESSION.post(
                         f"{agent_url}/shutdown",
                         json=signed_data,
-                        timeout=10
+                        timeout=(3, 10)
                     )
                     
                     if resp.status_code == 200:
@@ -101,7 +151,7 @@ def create_webui_app(agent_url: str, private_key_path: Path, password: str, targ
                 message = f"Error: {str(e)}"
                 logger.error(f"WebUI action failed: {e}")
         
-        return render_template("index.html", message=message, error=error, version=VERSION)
+        return render_template("index.html", message=message, error=error, version=VERSION)
     
     return app
 
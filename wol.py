@@ -1,79 +1,186 @@
-"""
-NanoWOL - Wake-on-LAN Module
-Handles sending WOL magic packets to wake remote machines.
-Part of the Nano Product Family.
-"""
-
-import re
-import socket
-import logging
-
-logger = logging.getLogger(__name__)
-
-# MAC address validation pattern
-MAC_PATTERN = re.compile(r'^([0-9A-Fa-f]{2}[:-]){5}([0-9A-Fa-f]{2})$')
-
-
-def validate_mac(mac_address: str) -> bool:
-    """
-    Validate MAC address format.
-    
-    Args:
-        mac_address: MAC address string (AA:BB:CC:DD:EE:FF or AA-BB-CC-DD-EE-FF)
-        
-    Returns:
-        True if valid format
-    """
-    return bool(MAC_PATTERN.match(mac_address))
-
-
-def normalize_mac(mac_address: str) -> str:
-    """
-    Normalize MAC address to uppercase without separators.
-    
-    Args:
-        mac_address: MAC address in any format
-        
-    Returns:
-        Uppercase MAC without separators (AABBCCDDEEFF)
-    """
-    return mac_address.replace(":", "").replace("-", "").upper()
-
-
-def send_wol_packet(mac_address: str, broadcast: str = "255.255.255.255", port: int = 9) -> None:
-    """
-    Send a Wake-on-LAN magic packet.
-    
-    The magic packet consists of:
-    - 6 bytes of 0xFF
-    - MAC address repeated 16 times
-    
-    Args:
-        mac_address: Target MAC address (format: AA:BB:CC:DD:EE:FF)
-        broadcast: Broadcast address (default: 255.255.255.255)
-        port: UDP port (default: 9, standard WOL port)
-        
-    Raises:
-        ValueError: If MAC address is invalid
-    """
-    # Clean and validate MAC address
-    mac = normalize_mac(mac_address)
-    
-    if len(mac) != 12:
-        raise ValueError(f"Invalid MAC address: {mac_address}")
-    
-    try:
-        mac_bytes = bytes.fromhex(mac)
-    except ValueError:
-        raise ValueError(f"Invalid MAC address characters: {mac_address}")
-    
-    # Build magic packet: 6 bytes of 0xFF + MAC repeated 16 times
-    magic_packet = b'\xff' * 6 + mac_bytes * 16
-    
-    # Send via UDP broadcast
-    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
-        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
-        sock.sendto(magic_packet, (broadcast, port))
-    
-    logger.info(f"WOL packet sent to {mac_address} via {broadcast}:{port}")
-
+"""
+NanoWOL - Wake-on-LAN Module
+Handles sending WOL magic packets to wake remote machines.
+Part of the Nano Product Family.
+"""
+
+import socket
+import logging
+import functools
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Shared broadcast socket, created on first send. UDP sendto is atomic
+# for packets this small, so concurrent senders need no lock once the
+# socket exists; the lock only guards creation.
+_UDP_SOCK = None
+_UDP_SOCK_LOCK = threading.Lock()
+
+
+def _get_udp_sock() -> socket.socket:
+    global _UDP_SOCK
+    sock = _UDP_SOCK
+    if sock is None:
+        with _UDP_SOCK_LOCK:
+            sock = _UDP_SOCK
+            if sock is None:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+                _UDP_SOCK = sock
+    return sock
+
+# Hex digit membership for the single-pass MAC parser
+_HEX_DIGITS = frozenset("0123456789abcdefABCDEF")
+
+# Single-pass normalization table: uppercases hex digits and deletes
+# separators in one str.translate scan
+_MAC_NORM_TABLE = str.maketrans('abcdef', 'ABCDEF', ':-')
+
+
+def validate_mac(mac_address: str) -> bool:
+    """
+    Validate MAC address format with a single-pass parse.
+
+    Accepts six hex octets joined by a consistent ':' or '-' separator.
+    A hand-rolled scan replaces the previous regex: no match-object
+    allocation and an immediate exit on the length check.
+
+    Args:
+        mac_address: MAC address string (AA:BB:CC:DD:EE:FF or AA-BB-CC-DD-EE-FF)
+
+    Returns:
+        True if valid format
+    """
+    if len(mac_address) != 17:
+        return False
+    sep = mac_address[2]
+    if sep != ":" and sep != "-":
+        return False
+    for i, ch in enumerate(mac_address):
+        if i % 3 == 2:
+            if ch != sep:
+                return False
+        elif ch not in _HEX_DIGITS:
+            return False
+    return True
+
+
+def normalize_mac(mac_address: str) -> str:
+    """
+    Normalize MAC address to uppercase without separators.
+    
+    Args:
+        mac_address: MAC address in any format
+        
+    Returns:
+        Uppercase MAC without separators (AABBCCDDEEFF)
+    """
+    return mac_address.translate(_MAC_NORM_TABLE)
+
+
+@functools.lru_cache(maxsize=16)
+def build_magic_packet(mac_normalized: str) -> bytes:
+    """
+    Build a WOL magic packet for a normalized MAC (AABBCCDDEEFF).
+
+    The packet is a pure function of the MAC, so it is cached: repeated
+    wakes of the same machine reuse the 102-byte packet instead of
+    re-parsing hex and re-concatenating bytes.
+
+    Raises:
+        ValueError: If the MAC is not 12 hex characters
+    """
+    if len(mac_normalized) != 12:
+        raise ValueError(f"Invalid MAC address length: {mac_normalized}")
+    mac_bytes = bytes.fromhex(mac_normalized)
+    # Fill one fixed-size buffer in place (6 bytes of 0xFF + MAC x 16)
+    # instead of allocating intermediate bytes objects and concatenating
+    buf = bytearray(102)
+    buf[:6] = b'\xff\xff\xff\xff\xff\xff'
+    for offset in range(6, 102, 6):
+        buf[offset:offset + 6] = mac_bytes
+    return bytes(buf)
+
+
+def send_magic_packet(magic_packet: bytes, broadcast: str = "255.255.255.255", port: int = 9) -> None:
+    """
+    Send a prebuilt magic packet via UDP broadcast.
+
+    Callers with a fixed target (agent, web UI) build the packet once
+    with build_magic_packet and skip validation/normalization per send.
+
+    Args:
+        magic_packet: Packet bytes from build_magic_packet
+        broadcast: Broadcast address (default: 255.255.255.255)
+        port: UDP port (default: 9, standard WOL port)
+    """
+    _get_udp_sock().sendto(magic_packet, (broadcast, port))
+
+
+def send_wol_packet(mac_address: str, broadcast: str = "255.255.255.255", port: int = 9) -> None:
+    """
+    Send a Wake-on-LAN magic packet.
+    
+    The magic packet consists of:
+    - 6 bytes of 0xFF
+    - MAC address repeated 16 times
+    
+    Args:
+        mac_address: Target MAC address (format: AA:BB:CC:DD:EE:FF)
+        broadcast: Broadcast address (default: 255.255.255.255)
+        port: UDP port (default: 9, standard WOL port)
+        
+    Raises:
+        ValueError: If MAC address is invalid
+    """
+    # Clean and validate MAC address
+    mac = normalize_mac(mac_address)
+
+    if len(mac) != 12:
+        raise ValueError(f"Invalid MAC address: {mac_address}")
+
+    try:
+        magic_packet = build_magic_packet(mac)
+    except ValueError:
+        raise ValueError(f"Invalid MAC address characters: {mac_address}")
+
+    # Send via UDP broadcast
+    send_magic_packet(magic_packet, broadcast, port)
+
+    logger.info("WOL packet sent to %s via %s:%s", mac_address, broadcast, port)
+
+
+def send_wol_packets(mac_addresses, broadcast: str = "255.255.255.255", port: int = 9) -> None:
+    """
+    Wake several machines in one call.
+
+    All packets are built (and validated) before the first send, then
+    pushed back-to-back through the shared broadcast socket — one
+    sendto per target with no socket churn in between.
+
+    Args:
+        mac_addresses: Iterable of target MAC addresses
+        broadcast: Broadcast address (default: 255.255.255.255)
+        port: UDP port (default: 9, standard WOL port)
+
+    Raises:
+        ValueError: If any MAC address is invalid (nothing is sent)
+    """
+    packets = []
+    for mac_address in mac_addresses:
+        mac = normalize_mac(mac_address)
+        if len(mac) != 12:
+            raise ValueError(f"Invalid MAC address: {mac_address}")
+        try:
+            packets.append(build_magic_packet(mac))
+        except ValueError:
+            raise ValueError(f"Invalid MAC address characters: {mac_address}")
+
+    sock = _get_udp_sock()
+    dest = (broadcast, port)
+    for packet in packets:
+        sock.sendto(packet, dest)
+
+    logger.info("WOL packets sent to %d targets via %s:%s", len(packets), broadcast, port)
+